@@ -37,13 +37,14 @@ def cmd_nest(args):
     open("quail.yml","w").write("project: covey\nprofile: dev\ndefault_covey: daily\n")
     open("Quailtrail","w").write("from quail.core import qtask,qcheck,CheckResult\n@qtask(id='hello')\ndef hello(ctx): return 'hi'\n")
 
-def main():
+def main(argv=None):
     p=argparse.ArgumentParser("quail")
     sub=p.add_subparsers(dest="cmd")
     t=sub.add_parser("trail"); t.add_argument("targets",nargs="*"); t.add_argument("--config",default="quail.yml"); t.add_argument("--module"); t.set_defaults(func=cmd_trail)
     l=sub.add_parser("list"); l.add_argument("--config",default="quail.yml"); l.add_argument("--module"); l.set_defaults(func=cmd_list)
     n=sub.add_parser("nest"); n.set_defaults(func=cmd_nest)
-    if len(sys.argv)>1 and sys.argv[1] not in {"trail","list","nest"}: sys.argv.insert(1,"trail")
-    args=p.parse_args(); 
+    argv=sys.argv[1:] if argv is None else list(argv)  # argv lets callers run the CLI in-process
+    if argv and argv[0] not in {"trail","list","nest"}: argv.insert(0,"trail")
+    args=p.parse_args(argv); 
     if not getattr(args,"func",None): p.print_help(); sys.exit(0)
     args.func(args)
@@ -2,19 +2,65 @@
 from __future__ import annotations
 from typing import Any, Dict, Callable, Optional, List, Iterable, Tuple
 import functools
+import re
+from collections import ChainMap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import SimpleQueue
+from itertools import islice
 import time
 import sys
-from sqlalchemy import create_engine, MetaData, Table
-from sqlalchemy.orm import sessionmaker
+
+# Monotonic integer clock for durations; wall-clock time.time() is kept only
+# for the absolute started_at/finished_at timestamps on CheckResult.
+_now = time.perf_counter_ns
 
 # --- Registries ----------------------------------------------------------------
 
 _TASKS: Dict[str, Callable] = {}
 _CHECKS: Dict[str, Callable] = {}
 
+# Every node by id, tasks and checks alike; ids are unique across both kinds.
+_NODES: Dict[str, Callable] = {}
+
+# Adjacency (node id -> required ids) of everything registered so far. Kept
+# acyclic at all times: a decorator whose requires would close a cycle raises.
+_ADJ: Dict[str, set] = {}
+
+# Every id that appears in some node's requires. A new node can only close a
+# cycle if something already requires it, so ids outside this set skip the DFS
+# (the usual declare-upstream-first case). Never shrinks; a stale id only
+# costs an unneeded DFS.
+_REQUIRED: set = set()
+
+# Bumped on every successful registration; derived caches key on it.
+_EPOCH = 0
+
+# Cache derived from the registries, valid while _CACHE_EPOCH == _EPOCH:
+#   _RESOLVED: wrapper -> its requires resolved to wrapper functions
+_RESOLVED: Dict[Callable, List[Callable]] = {}
+_CACHE_EPOCH = -1
+
+# --- Errors --------------------------------------------------------------------
+
+class CycleError(ValueError):
+    """Raised at registration time when a node's requires close a dependency cycle."""
+
+    def __init__(self, path: List[str]):
+        self.path = path
+        super().__init__("Dependency cycle: " + " -> ".join(path))
+
 # --- Data types ----------------------------------------------------------------
 
 class CheckResult:
+    # Slotted (no per-instance __dict__): one is allocated per check per run.
+    # Not frozen, since qcheck stamps timings, id and severity onto it.
+    __slots__ = (
+        "id", "status", "severity", "metrics", "description", "error",
+        "started_at", "finished_at", "started_at_ns", "finished_at_ns",
+        "_default_start",
+    )
+
     def __init__(
         self,
         id: str,
@@ -25,6 +71,8 @@ class CheckResult:
         error: str | None = None,
         started_at: float | None = None,
         finished_at: float | None = None,
+        started_at_ns: int | None = None,   # perf_counter_ns stamps, set by qcheck
+        finished_at_ns: int | None = None,
     ):
         self.id = id
         self.status = status
@@ -32,8 +80,16 @@ class CheckResult:
         self.metrics = metrics or {}
         self.description = description
         self.error = error
-        self.started_at = started_at or time.time()
-        self.finished_at = finished_at or time.time()
+        # True when started_at was not given, so qcheck may backfill the real start
+        self._default_start = not started_at
+        if started_at is None or finished_at is None:
+            now = time.time()
+            started_at = started_at or now
+            finished_at = finished_at or now
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.started_at_ns = started_at_ns
+        self.finished_at_ns = finished_at_ns
 
 # --- Context -------------------------------------------------------------------
 
@@ -41,33 +97,121 @@ class QContext:
     def __init__(self, env: Dict[str, Any], params: Dict[str, Any], workdir: str = ".quail"):
         self.env = env
         self.params = params
+        # Produced artifacts only; params/env are read-only fallbacks for get().
         self.artifacts: Dict[str, Any] = {}
+        self._fallback = ChainMap(params or {}, env or {})
         self.workdir = workdir
+        # Guards artifacts when Runner.run(parallel=True) runs nodes on threads
+        self._lock = threading.Lock()
 
     def put(self, k: str, v: Any) -> None:
-        self.artifacts[k] = v
+        with self._lock:
+            self.artifacts[k] = v
+
+    def merge(self, mapping: Dict[str, Any]) -> None:
+        """Expose every key of `mapping` at once (a single C-level dict.update)."""
+        with self._lock:
+            self.artifacts.update(mapping)
 
     def get(self, k: str, default: Any = None) -> Any:
-        # allow a default to be provided
-        return self.artifacts.get(k, default)
+        # allow a default to be provided; falls back to params, then env
+        with self._lock:
+            if k in self.artifacts:
+                return self.artifacts[k]
+        return self._fallback.get(k, default)
 
     def has(self, k: str) -> bool:
-        return k in self.artifacts
+        # only produced artifacts count, so a param never masks a task id
+        with self._lock:
+            return k in self.artifacts
 
 # --- Decorators ----------------------------------------------------------------
 
-def qtask(id: str | None = None, requires: Optional[List[str]] = None):
+def _find_cycle(start: str) -> Optional[List[str]]:
+    """
+    Tri-color DFS over _ADJ from `start`. The registry was acyclic before the
+    latest registration, so any cycle must pass through `start`.
+    Iterative (explicit stack of child iterators), so deep requires chains
+    cannot hit the interpreter's recursion limit.
+    Returns the cycle as a path (first == last) or None.
+    """
+    gray, black = 1, 2
+    color: Dict[str, int] = {start: gray}
+    path: List[str] = [start]
+    stack = [iter(_ADJ.get(start, ()))]
+    while stack:
+        for d in stack[-1]:
+            c = color.get(d)
+            if c == gray:
+                return path[path.index(d):] + [d]
+            if c is None:
+                color[d] = gray
+                path.append(d)
+                stack.append(iter(_ADJ.get(d, ())))
+                break
+        else:
+            stack.pop()
+            color[path.pop()] = black
+    return None
+
+def _add_edges(rid: str, requires: List[str]) -> None:
+    """
+    Record a node's requires in _ADJ (replacing a re-registered node's edges),
+    rolling back and raising CycleError on a cycle.
+    """
+    global _EPOCH
+    old = _ADJ.get(rid)
+    _ADJ[rid] = set(requires)
+    _REQUIRED.update(requires)
+    path = _find_cycle(rid) if rid in _REQUIRED else None
+    if path:
+        if old is None:
+            del _ADJ[rid]
+        else:
+            _ADJ[rid] = old
+        raise CycleError(path)
+    _EPOCH += 1
+
+def _origin(fn: Callable) -> Tuple[Any, ...]:
+    """Where `fn` was defined: module, qualname, file and first line."""
+    code = getattr(fn, "__code__", None)
+    return (
+        getattr(fn, "__module__", None), getattr(fn, "__qualname__", None),
+        code and code.co_filename, code and code.co_firstlineno,
+    )
+
+def _check_id(rid: str, fn: Callable, kind: str) -> None:
+    """
+    Reject an id already taken by the other kind of node or by a different
+    definition. The same definition registering again (e.g. a Quailtrail
+    re-run in-process via runpy) replaces its earlier entry; two lambdas or
+    same-named defs at different places do not.
+    """
+    old = _NODES.get(rid)
+    if old is None:
+        return
+    if old.__qmeta__["type"] != kind or _origin(old.__wrapped__) != _origin(fn):
+        raise ValueError(f"duplicate node id {rid}")
+
+def qtask(id: str | None = None, requires: Optional[List[str]] = None, returns: str | None = None):
     """
     Register a producer step. Its return value is auto-saved in ctx[id].
     If it returns a dict, those keys are also merged into ctx for convenience.
     If ctx already has a value for this id, the function is not re-run.
+    `returns="dict"` or `returns="scalar"` declares the result shape up front,
+    so the wrapper is specialized: "scalar" never merges, and "dict" always
+    merges (a "dict" task that returns anything else raises TypeError).
+    Raises ValueError if the id is already registered as a check or by a
+    different function, and CycleError if `requires` would close a dependency
+    cycle. Re-registering the same function replaces it.
     """
+    if returns not in (None, "dict", "scalar"):
+        raise ValueError(f"returns must be 'dict', 'scalar' or None, not {returns!r}")
     requires = requires or []
     def deco(fn):
         rid = id or fn.__name__
 
-        @functools.wraps(fn)
-        def wrapper(ctx: QContext):
+        def generic(ctx: QContext):
             # Idempotence: if we already have the artifact, return it
             if ctx.has(rid):
                 return ctx.get(rid)
@@ -77,19 +221,43 @@ def qtask(id: str | None = None, requires: Optional[List[str]] = None):
             ctx.put(rid, result)
             # If mapping, merge into ctx for convenient downstream ctx.get("key")
             if isinstance(result, dict):
-                for k, v in result.items():
-                    ctx.put(k, v)
+                ctx.merge(result)
+            return result
+
+        def scalar(ctx: QContext):
+            if ctx.has(rid):
+                return ctx.get(rid)
+            result = fn(ctx)
+            ctx.put(rid, result)
             return result
 
-        wrapper.__qmeta__ = {"id": rid, "requires": requires, "type": "task"}
+        def mapping(ctx: QContext):
+            if ctx.has(rid):
+                return ctx.get(rid)
+            result = fn(ctx)
+            if not isinstance(result, dict):
+                raise TypeError(f"task {rid} declared returns='dict' but returned {type(result).__name__}")
+            ctx.put(rid, result)
+            ctx.merge(result)
+            return result
+
+        wrapper = functools.wraps(fn)({None: generic, "scalar": scalar, "dict": mapping}[returns])
+
+        _check_id(rid, fn, "task")
+        _add_edges(rid, requires)
+        wrapper.__qmeta__ = {"id": rid, "requires": requires, "type": "task", "returns": returns}
         _TASKS[rid] = wrapper
+        _NODES[rid] = wrapper
         return wrapper
     return deco
 
 def qcheck(id: str | None = None, requires: Optional[List[str]] = None, severity: str = "error"):
     """
-    Register a check. Ensures timing fields and metadata. The CheckResult is
+    Register a check. Ensures id/severity metadata. The CheckResult is
     also cached into ctx[id] for introspection by later nodes or reporting.
+    Raises ValueError if the id is already registered as a task or by a
+    different function, and CycleError if `requires` would close a dependency
+    cycle. Re-registering the same function replaces it.
     """
     requires = requires or []
     def deco(fn):
@@ -97,13 +265,19 @@ def qcheck(id: str | None = None, requires: Optional[List[str]] = None, severity
 
         @functools.wraps(fn)
         def wrapper(ctx: QContext) -> CheckResult:
-            start = time.time()
+            start = time.time()  # wall clock, only for started_at
+            t0 = _now()
             try:
                 # Run user check
                 res: CheckResult = fn(ctx)
-                # Ensure timing/metadata
-                res.started_at = res.started_at or start
-                res.finished_at = res.finished_at or time.time()
+                # Duration is measured around the call itself
+                res.started_at_ns, res.finished_at_ns = t0, _now()
+                # A defaulted started_at is the construction time (i.e. the end
+                # of the check); pull it back to when the check really started.
+                # One the check set explicitly is kept.
+                if res._default_start:
+                    res.started_at = start
+                    res._default_start = False
                 res.id = res.id or rid
                 res.severity = res.severity or severity
                 # Auto-cache the check result
@@ -112,14 +286,17 @@ def qcheck(id: str | None = None, requires: Optional[List[str]] = None, severity
             except Exception as e:
                 err = CheckResult(
                     id=rid, status="error", severity=severity,
-                    error=str(e), started_at=start, finished_at=time.time()
+                    error=str(e), started_at=start, started_at_ns=t0, finished_at_ns=_now()
                 )
                 # Cache the error result too
                 ctx.put(rid, err)
                 return err
 
+        _check_id(rid, fn, "check")
+        _add_edges(rid, requires)
         wrapper.__qmeta__ = {"id": rid, "requires": requires, "type": "check", "severity": severity}
         _CHECKS[rid] = wrapper
+        _NODES[rid] = wrapper
         return wrapper
     return deco
 
@@ -128,6 +305,73 @@ def qcheck(id: str | None = None, requires: Optional[List[str]] = None, severity
 def list_nodes() -> Dict[str, List[str]]:
     return {"tasks": list(_TASKS.keys()), "checks": list(_CHECKS.keys())}
 
+def _sync_caches() -> None:
+    global _CACHE_EPOCH
+    if _CACHE_EPOCH != _EPOCH:
+        _RESOLVED.clear()
+        _CACHE_EPOCH = _EPOCH
+
+def _resolve(fn: Callable, graph: Dict[str, Callable]) -> List[Callable]:
+    """
+    The requires of `fn` as wrapper functions rather than ids, so graph walks
+    follow pointers instead of re-indexing `graph`. Cached until the next
+    registration.
+    """
+    _sync_caches()
+    deps = _RESOLVED.get(fn)
+    if deps is None:
+        reqs = fn.__qmeta__["requires"]
+        for d in reqs:
+            if d not in graph:
+                raise KeyError(f"Unknown dependency '{d}' required by '{fn.__qmeta__['id']}'")
+        deps = _RESOLVED[fn] = [graph[d] for d in reqs]
+    return deps
+
+# --- Schedules -----------------------------------------------------------------
+
+_TASK, _CHECK = 0, 1
+_KIND_NAMES = ("task", "check")
+
+class _Schedule:
+    """
+    Struct-of-arrays form of a compiled run. Node i is names[i] / fns[i] /
+    kinds[i] (_TASK or _CHECK), in the closure's DFS post-order: targets in
+    the order given, each preceded by its not-yet-scheduled requires. Its requires are
+    req_flat[req_offsets[i]:req_offsets[i + 1]] and its dependents are
+    succ_flat[succ_offsets[i]:succ_offsets[i + 1]], both as indices into the
+    same arrays.
+    """
+    __slots__ = ("names", "fns", "kinds", "req_offsets", "req_flat", "succ_offsets", "succ_flat")
+
+    def __init__(self, deps: Dict[Callable, List[Callable]]):
+        # `deps` is already dependencies-first (Runner._closure), so keep its order
+        self.fns: List[Callable] = list(deps)
+        self.names: List[str] = [fn.__qmeta__["id"] for fn in self.fns]
+        self.kinds: List[int] = [_TASK if fn.__qmeta__["type"] == "task" else _CHECK for fn in self.fns]
+
+        index = {fn: i for i, fn in enumerate(self.fns)}
+        self.req_offsets: List[int] = [0]
+        self.req_flat: List[int] = []
+        succs: List[List[int]] = [[] for _ in self.fns]
+        for i, fn in enumerate(self.fns):
+            for d in deps[fn]:
+                j = index[d]
+                self.req_flat.append(j)
+                succs[j].append(i)
+            self.req_offsets.append(len(self.req_flat))
+
+        self.succ_offsets: List[int] = [0]
+        self.succ_flat: List[int] = []
+        for s in succs:
+            self.succ_flat.extend(s)
+            self.succ_offsets.append(len(self.succ_flat))
+
+# Progress badge and summary bucket per CheckResult.status; anything else counts as error
+_BADGES = {"pass": "✅ PASS", "fail": "❌ FAIL", "skip": "⏭️ SKIP", "error": "💥 ERROR"}
+_TALLY_KEYS = frozenset(_BADGES)
+
+_SAY_BUFFER_BYTES = 64 * 1024
+
 # --- Runner --------------------------------------------------------------------
 
 class Runner:
@@ -146,46 +390,128 @@ class Runner:
         self.max_workers = max_workers
         self.progress = progress
         self._stream = stream
+        # Progress lines are batched into one write+flush per _SAY_BUFFER_BYTES
+        # (and at the end of run()); interactive terminals still get each line
+        # as it happens.
+        self._buf: List[str] = []
+        self._buf_bytes = 0
+        isatty = getattr(stream, "isatty", None)
+        self._line_buffered = bool(isatty and isatty())
 
     def _say(self, msg: str):
         if self.progress:
-            print(msg, file=self._stream, flush=True)
-
-    def _topo(self, targets: Iterable[str], graph: Dict[str, Callable]) -> List[str]:
+            line = msg + "\n"
+            self._buf.append(line)
+            self._buf_bytes += len(line)
+            if self._line_buffered or self._buf_bytes > _SAY_BUFFER_BYTES:
+                self._flush()
+
+    def _flush(self):
+        if self._buf:
+            self._stream.write("".join(self._buf))
+            self._stream.flush()
+            self._buf.clear()
+            self._buf_bytes = 0
+
+    @staticmethod
+    def _closure(
+        targets: List[str],
+        graph: Dict[str, Callable],
+        ctx: Optional[QContext] = None,
+    ) -> Dict[Callable, List[Callable]]:
         """
-        Simple DFS-based topological order over the combined task/check graph
-        using each node's __qmeta__["requires"].
+        Transitive requires of `targets` as a wrapper -> resolved-requires map,
+        inserted dependencies first (a valid run order). Given a `ctx` from an earlier
+        run, tasks it already holds are pruned together with anything only
+        they required (a cached target stays, but is not expanded).
         """
-        seen, out = set(), []
-
-        def visit(n: str):
-            if n in seen:
-                return
-            for d in graph[n].__qmeta__["requires"]:
-                if d not in graph:
-                    raise KeyError(f"Unknown dependency '{d}' required by '{n}'")
-                visit(d)
-            seen.add(n)
-            out.append(n)
-
         for t in targets:
             if t not in graph:
                 raise KeyError(f"Unknown node/target: {t}")
-            visit(t)
-        return out
 
-    def run(self, targets: Iterable[str], parallel: bool = False) -> Dict[str, Tuple[str, Any]]:
+        def cached(fn: Callable) -> bool:
+            return ctx is not None and fn.__qmeta__["type"] == "task" and ctx.has(fn.__qmeta__["id"])
+
+        # Iterative post-order DFS with one visited set, so dependencies are
+        # inserted before their dependents in O(V + E). A stack entry with
+        # `live` set is the post-visit of a node whose requires are done.
+        deps: Dict[Callable, List[Callable]] = {}
+        seen = set()
+        stack: List[Tuple[Callable, Optional[List[Callable]]]] = [(graph[t], None) for t in reversed(targets)]
+        while stack:
+            fn, live = stack.pop()
+            if live is not None:
+                deps[fn] = live
+                continue
+            if fn in seen:
+                continue
+            seen.add(fn)
+            live = [] if cached(fn) else [d for d in _resolve(fn, graph) if not cached(d)]
+            stack.append((fn, live))
+            stack.extend((d, None) for d in reversed(live) if d not in seen)
+        return deps
+
+    def _compile_schedule(self, targets: List[str]) -> _Schedule:
+        """Compiled schedule for `targets`, reused across runs until the next registration."""
+        return _schedule_for(tuple(targets), _EPOCH)
+
+    @staticmethod
+    def _execute(fn: Callable, kind: int, ctx: QContext) -> Tuple[Any, float]:
+        """Runs one node; returns (value, elapsed ms). Safe to call from a worker thread."""
+        t0 = _now()
+        val = fn(ctx)
+        if kind == _TASK:
+            return val, (_now() - t0) / 1e6
+        return val, (val.finished_at_ns - val.started_at_ns) / 1e6
+
+    def run(
+        self,
+        targets: Iterable[str],
+        parallel: Optional[bool] = None,
+        ctx: Optional[QContext] = None,
+    ) -> Dict[str, Tuple[str, Any]]:
         """
         Executes the targets (tasks and/or checks) after computing a topo order
-        over their transitive requires. Sequential execution with progress logs.
+        over their transitive requires, with progress logs.
+
+        With parallel=True, nodes whose requires are satisfied are dispatched to
+        a ThreadPoolExecutor(max_workers) as soon as they become ready, so
+        independent (typically I/O-bound) nodes overlap. Progress, results and
+        the summary are recorded on the calling thread as nodes complete.
+        parallel=None takes the `parallel` param (quail.yml params), default False;
+        string values count as true only for "true", "1" or "yes".
+
+        Pass the QContext of an earlier (e.g. partially failed) run as `ctx` to
+        resume it: tasks whose artifacts it already holds are left out of the
+        schedule, along with upstream nodes only they needed. Checks always
+        re-run.
         """
-        if parallel:
-            # Parallel execution is not implemented in this minimal core.
-            self._say("⚠️ parallel=True requested but not implemented; running sequentially.")
-
-        graph = {**_TASKS, **_CHECKS}
-        order = self._topo(targets, graph)
-        ctx = QContext(env=self.env, params=self.params, workdir=self.workdir)
+        if parallel is None:
+            parallel = _as_bool((self.params or {}).get("parallel", False))
+        try:
+            return self._run(targets, parallel, ctx)
+        finally:
+            self._flush()
+
+    def _run(self, targets: Iterable[str], parallel: bool, ctx: Optional[QContext]) -> Dict[str, Tuple[str, Any]]:
+        graph = _NODES
+        targets = list(targets)
+
+        # Fast path: a single dependency-free target with progress off (e.g. a
+        # harness calling one check in a loop) needs no scheduling or summary.
+        if len(targets) == 1 and not self.progress:
+            fn = graph.get(targets[0])
+            if fn is not None and not fn.__qmeta__["requires"]:
+                ctx = ctx or QContext(env=self.env, params=self.params, workdir=self.workdir)
+                return {targets[0]: (fn.__qmeta__["type"], fn(ctx))}
+
+        if ctx is None:
+            sched = self._compile_schedule(targets)
+            ctx = QContext(env=self.env, params=self.params, workdir=self.workdir)
+        else:
+            # Pruning depends on what ctx holds, so this schedule is not cached
+            sched = _Schedule(self._closure(targets, graph, ctx))
+        names, fns, kinds = sched.names, sched.fns, sched.kinds
         results: Dict[str, Tuple[str, Any]] = {}
 
         # For the summary
@@ -193,52 +519,65 @@ class Runner:
         check_tally = {"pass": 0, "fail": 0, "skip": 0, "error": 0}
         tasks_run = 0
 
-        for n in order:
-            fn = graph[n]
-            kind = fn.__qmeta__["type"]
-
-            if kind == "task":
-                # Task execution (auto-cached by decorator)
-                self._say(f"🏃 running: {n} [task]")
-                t0 = time.time()
-                val = fn(ctx)
-                dt = (time.time() - t0) * 1000
+        def record(n: str, kind: int, val: Any, dt: float) -> None:
+            nonlocal tasks_run
+            if kind == _TASK:
                 results[n] = ("task", val)
                 self._say(f"✅ done: {n} ({dt:.0f} ms)")
                 tasks_run += 1
                 summary_rows.append((n, "task", "done", "-", dt))
+                return
 
-            else:
-                # Check execution (auto-cached by decorator)
-                self._say(f"🏃 running: {n} [check]")
-                start_wall = time.time()
-                res: CheckResult = fn(ctx)
-                results[n] = ("check", res)
+            res: CheckResult = val
+            results[n] = ("check", res)
+            # Read each field once
+            status, severity, metrics = res.status, res.severity, res.metrics
 
-                # Ensure timings are present
-                res.started_at = res.started_at or start_wall
-                res.finished_at = res.finished_at or time.time()
-                dt = (res.finished_at - res.started_at) * 1000
+            badge = _BADGES.get(status, "💥 ERROR")
 
-                if res.status == "pass":
-                    badge = "✅ PASS"
-                elif res.status == "fail":
-                    badge = "❌ FAIL"
-                elif res.status == "skip":
-                    badge = "⏭️ SKIP"
-                else:
-                    badge = "💥 ERROR"
+            metric_snippet = ""
+            if metrics:
+                items = islice(metrics.items(), 2)
+                metric_snippet = " " + " ".join([f"{k}={_short(v)}" for k, v in items])
 
-                metric_snippet = ""
-                if isinstance(res.metrics, dict) and res.metrics:
-                    items = list(res.metrics.items())[:2]
-                    metric_snippet = " " + " ".join([f"{k}={_short(v)}" for k, v in items])
+            self._say(f"{badge}: {n} [{severity}] ({dt:.0f} ms){metric_snippet}")
 
-                self._say(f"{badge}: {n} [{res.severity}] ({dt:.0f} ms){metric_snippet}")
+            # Tally & record for summary
+            check_tally[status if status in _TALLY_KEYS else "error"] += 1
+            summary_rows.append((n, "check", status, severity, dt))
 
-                # Tally & record for summary
-                check_tally[res.status if res.status in check_tally else "error"] += 1
-                summary_rows.append((n, "check", res.status, res.severity, dt))
+        if parallel:
+            # Kahn-style dispatch over the schedule's index arrays
+            req_offsets, succ_offsets, succ_flat = sched.req_offsets, sched.succ_offsets, sched.succ_flat
+            indeg = [req_offsets[i + 1] - req_offsets[i] for i in range(len(names))]
+            ready = [i for i, d in enumerate(indeg) if d == 0]
+            # Workers report completions through a lock-free SimpleQueue; the
+            # calling thread is the only consumer and releases successors.
+            done_q: SimpleQueue = SimpleQueue()
+            inflight = 0
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while ready or inflight:
+                    for i in ready:
+                        self._say(f"🏃 running: {names[i]} [{_KIND_NAMES[kinds[i]]}]")
+                        fut = pool.submit(self._execute, fns[i], kinds[i], ctx)
+                        fut.add_done_callback(lambda f, i=i: done_q.put((i, f)))
+                    inflight += len(ready)
+                    ready = []
+                    i, fut = done_q.get()
+                    inflight -= 1
+                    val, dt = fut.result()
+                    record(names[i], kinds[i], val, dt)
+                    for j in succ_flat[succ_offsets[i]:succ_offsets[i + 1]]:
+                        indeg[j] -= 1
+                        if indeg[j] == 0:
+                            ready.append(j)
+        else:
+            for i in range(len(names)):
+                n, kind = names[i], kinds[i]
+                # Execution is auto-cached into ctx by the decorators
+                self._say(f"🏃 running: {n} [{_KIND_NAMES[kind]}]")
+                val, dt = self._execute(fns[i], kind, ctx)
+                record(n, kind, val, dt)
 
         # --- Run Summary ----------------------------------------------------
         if self.progress:
@@ -260,28 +599,54 @@ class Runner:
 
         return results
 
+@functools.lru_cache(maxsize=32)
+def _schedule_for(targets: Tuple[str, ...], epoch: int) -> _Schedule:
+    # `epoch` is part of the cache key so registrations invalidate old entries
+    return _Schedule(Runner._closure(list(targets), _NODES))
+
 # --- Utils --------------------------------------------------------------------
 
+def _as_bool(v: Any) -> bool:
+    # params may be strings after ${VAR} expansion, where "false"/"0" must stay off
+    if isinstance(v, str):
+        return v.strip().lower() in ("true", "1", "yes")
+    return bool(v)
+
 def _short(v: Any) -> str:
-    s = str(v)
-    return s if len(s) <= 80 else s[:77] + "..."
+    s = v if isinstance(v, str) else str(v)
+    return s if len(s) <= 80 else f"{s[:77]}..."
 
 # --- Quail helpers (moved here from prototype) --------------------------------
 # Lightweight, optional dependencies: imports happen inside functions.
 
-def load_quail_config(path: str = "quail.yml"):
+# Same syntax os.path.expandvars accepts: ${NAME} or $NAME
+_VAR_RE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}|\$([A-Za-z_][A-Za-z0-9_]*)")
+
+@functools.lru_cache(maxsize=8)
+def _parse_quail_yaml(path: str, mtime_ns: int) -> dict:
     """
-    Load quail.yml, resolve profile/env/params, expand ${VAR} in params.
-    Returns: (cfg, env_cfg, params, targets, default_covey, profile)
+    Parsed YAML for `path`. `mtime_ns` is only part of the cache key, so an
+    edited file is re-parsed. Callers must not mutate the returned dict.
     """
     try:
-        import os
         import yaml  # type: ignore
     except Exception as e:
-        raise RuntimeError("load_quail_config requires PyYAML and os") from e
+        raise RuntimeError("load_quail_config requires PyYAML") from e
 
     with open(path, "r", encoding="utf-8") as f:
-        cfg = (yaml.safe_load(f) or {})
+        return (yaml.safe_load(f) or {})
+
+def load_quail_config(path: str = "quail.yml"):
+    """
+    Load quail.yml, resolve profile/env/params, expand ${VAR} in params.
+    The YAML parse is memoized per (path, mtime); callers get a private copy.
+    Returns: (cfg, env_cfg, params, targets, default_covey, profile)
+    """
+    import copy
+    import os
+
+    path = os.path.abspath(path)
+    cfg = copy.deepcopy(_parse_quail_yaml(path, os.stat(path).st_mtime_ns))
 
     # profile resolution: env var or yaml
     profile = os.environ.get("QUAIL_PROFILE") or cfg.get("profile") or "dev"
@@ -289,10 +654,13 @@ def load_quail_config(path: str = "quail.yml"):
     env_cfg = envs.get(profile, {})
     params = (cfg.get("params") or {}).copy()
 
-    # expand ${VAR} in string params
-    for k, v in list(params.items()):
-        if isinstance(v, str):
-            params[k] = os.path.expandvars(v)
+    # expand ${VAR} / $VAR in string params (unknown vars are left as-is)
+    environ = os.environ
+    def sub(m: re.Match) -> str:
+        return environ.get(m.group(1) or m.group(2), m.group(0))
+    for k, v in params.items():
+        if isinstance(v, str) and "$" in v:
+            params[k] = _VAR_RE.sub(sub, v)
 
     targets = cfg.get("targets") or {}
     default_covey = cfg.get("default_covey") or "pricing"
@@ -320,38 +688,46 @@ def build_env_from_orm(orm_cfg: dict):
     default_schema = orm_cfg.get("schema")
     reflect = orm_cfg.get("reflect", []) or []
 
-    engine = create_engine(url, future=True)
-    Session = sessionmaker(bind=engine, future=True)
-
-    env = {
-        "engine": engine,
-        "session_factory": Session,
-        "schema": default_schema,
-        "reflect": reflect,  # pass-through for tasks
-    }
+    # SQLAlchemy is heavy to import; orm._sa() loads it on first use, once.
+    # The engine, sessions and bound helpers are assembled by orm.engine_env,
+    # the same as for orm.build_env_from_cfg.
+    from .orm import _sa, engine_env
+    sa = _sa()
+    env = engine_env(url, orm_cfg)
+    env["schema"] = default_schema
+    env["reflect"] = reflect  # pass-through for tasks
+    get_inspector = env["get_inspector"]
 
     tables = {}
     registry = {}
 
-    # Reflect here, supporting both str and dict items
+    # Normalize reflect entries, supporting both str and dict items
+    entries: List[Tuple[str, Optional[str], str]] = []  # (name, schema, alias)
     for item in reflect:
         if isinstance(item, str):
-            name, schema, alias = item, default_schema, item
+            entries.append((item, default_schema, item))
         elif isinstance(item, dict):
             name = item.get("name") or item.get("table")
             if not name:
                 continue
-            schema = item.get("schema", default_schema)
-            alias = item.get("alias", name)
-        else:
-            # skip unknown entries
-            continue
-
-        md = MetaData(schema=schema)
-        t = Table(name, md, schema=schema, autoload_with=engine)
-        key = f"{schema}.{name}" if schema else name
-        tables[key] = t
-        registry[alias] = key
+            entries.append((name, item.get("schema", default_schema), item.get("alias", name)))
+        # skip unknown entries
+
+    # One batched MetaData.reflect pass per schema, rather than a
+    # Table(autoload_with=...) round-trip set per table. All passes go through
+    # the same Inspector so its info_cache is shared between schemas.
+    if entries:
+        by_schema: Dict[Optional[str], List[str]] = {}
+        for name, schema, _ in entries:
+            by_schema.setdefault(schema, []).append(name)
+        md = sa.MetaData()
+        insp = get_inspector()
+        for schema, names in by_schema.items():
+            md.reflect(bind=insp, schema=schema, only=list(dict.fromkeys(names)))
+        for name, schema, alias in entries:
+            key = f"{schema}.{name}" if schema else name
+            tables[key] = md.tables[key]
+            registry[alias] = key
 
     if tables:
         env["tables"] = tables
@@ -423,7 +799,7 @@ def resolve_targets(cfg_targets: dict, default_covey: str, cli_targets: Optional
 
 __all__ = [
     # core
-    "QContext", "CheckResult", "qtask", "qcheck", "Runner", "list_nodes",
+    "QContext", "CheckResult", "CycleError", "qtask", "qcheck", "Runner", "list_nodes",
     # helpers
     "load_quail_config", "build_env_from_orm", "resolve_targets",
 ]
@@ -1,11 +1,16 @@
+from io import StringIO
+from . import core
 from .core import _TASKS,_CHECKS
+_DOT_CACHE=None  # (registry epoch, dot); any registration bumps core._EPOCH
 def build_dot()->str:
-    lines=["digraph quail {","  rankdir=LR;"]
-    def add(n,kind):
-        shape="box" if kind=="task" else "oval"
-        lines.append(f'  "{n}" [shape={shape}];')
-    for n in _TASKS: add(n,"task")
-    for n in _CHECKS: add(n,"check")
-    for n,fn in {**_TASKS,**_CHECKS}.items():
-        for d in fn.__qmeta__["requires"]: lines.append(f'  "{d}" -> "{n}";')
-    lines.append("}"); return "\n".join(lines)
+    global _DOT_CACHE
+    if _DOT_CACHE and _DOT_CACHE[0]==core._EPOCH: return _DOT_CACHE[1]
+    buf=StringIO(); w=buf.write
+    w("digraph quail {\n  rankdir=LR;\n")
+    for n in _TASKS: w(f'  "{n}" [shape=box];\n')
+    for n in _CHECKS: w(f'  "{n}" [shape=oval];\n')
+    for reg in (_TASKS,_CHECKS):
+        for n,fn in reg.items():
+            for d in fn.__qmeta__["requires"]: w(f'  "{d}" -> "{n}";\n')
+    w("}"); dot=buf.getvalue()
+    _DOT_CACHE=(core._EPOCH,dot); return dot
@@ -1,22 +1,288 @@
 from typing import Dict, Any
+from collections.abc import Mapping
+import atexit, functools, hashlib, json, os, pickle, threading, time
+
+# Optional backends are imported on first use and memoized, so `import quail.cli` (and
+# quail --help / quail list) never loads them. Each accessor raises RuntimeError naming
+# the extra to install when the package is missing.
+@functools.lru_cache(maxsize=None)
+def _sa():
+    """The sqlalchemy package, with sqlalchemy.orm loaded (sa.orm.sessionmaker etc.)."""
+    try:
+        import sqlalchemy, sqlalchemy.orm
+    except ImportError as e:
+        raise RuntimeError("SQLAlchemy is not installed (pip install 'quail[db]')") from e
+    return sqlalchemy
+
+@functools.lru_cache(maxsize=None)
+def _pymongo():
+    try:
+        import pymongo
+    except ImportError as e:
+        raise RuntimeError("pymongo is not installed (pip install 'quail[mongo]')") from e
+    return pymongo
+
+# QueuePool sizing for SQL envs; SQLAlchemy's defaults (5 + 10 overflow) throttle
+# parallel runs. Each can be set in the orm cfg; QUAIL_POOL_SIZE and
+# QUAIL_MAX_OVERFLOW override the cfg.
+_POOL_DEFAULTS={"pool_size":20,"max_overflow":30,"pool_timeout":30,"pool_recycle":1800}
+_POOL_ENV={"pool_size":"QUAIL_POOL_SIZE","max_overflow":"QUAIL_MAX_OVERFLOW"}
+
+def _pool_options(cfg: Dict[str,Any], url: str)->Dict[str,Any]:
+    sa=_sa(); opts={"pool_pre_ping":True}
+    if sa.make_url(url).get_backend_name()=="sqlite": return opts  # sqlite picks its own single-connection pools
+    for k,v in _POOL_DEFAULTS.items():
+        env=_POOL_ENV.get(k)
+        opts[k]=int(os.environ.get(env) or cfg.get(k,v)) if env else int(cfg.get(k,v))
+    opts["poolclass"]=sa.QueuePool  # explicit, so third-party dialects don't fall back to another pool
+    return opts
+
+def _dialect_options(cfg: Dict[str,Any], url: str)->Dict[str,Any]:
+    """executemany tuning: psycopg2 (PG/Redshift) also pages UPDATE/DELETE executemany via execute_batch
+    (INSERTs already use insertmanyvalues); insertmanyvalues_page_size can be set in the cfg. query_cache_size
+    sizes the engine's compiled-statement cache (default 500), which repeated check statements hit."""
+    opts={}
+    if _sa().make_url(url).get_driver_name()=="psycopg2": opts["executemany_mode"]=cfg.get("executemany_mode","values_plus_batch")
+    for k in ("insertmanyvalues_page_size","query_cache_size"):
+        if k in cfg: opts[k]=int(cfg[k])
+    return opts
+
+def execute_many(bind, stmt, params, page_size: int=1000)->int:
+    """Executes stmt with params in executemany pages of page_size, one round-trip set per page instead of per row.
+    bind is an Engine (runs in its own committed transaction) or a Connection/Session (caller commits). Returns len(params)."""
+    sa=_sa()
+    if isinstance(stmt,str): stmt=sa.text(stmt)
+    params=list(params)
+    if isinstance(bind,sa.Engine):
+        with bind.begin() as conn: return execute_many(conn,stmt,params,page_size)
+    for i in range(0,len(params),page_size): bind.execute(stmt,params[i:i+page_size])
+    return len(params)
+
+def stream_query(bind, stmt, chunk_size: int=10_000):
+    """Yields lists of up to chunk_size rows over a server-side cursor (stream_results; psycopg2 uses a
+    named cursor), so memory is O(chunk_size) rather than O(rows). bind is an Engine (a connection is held
+    until the generator finishes) or a Connection. Iterate to completion or close() the generator."""
+    sa=_sa()
+    if isinstance(stmt,str): stmt=sa.text(stmt)
+    conn=bind.connect() if isinstance(bind,sa.Engine) else bind
+    try:
+        # per-statement options: Connection.execution_options() would change a caller's connection in place
+        result=conn.execute(stmt,execution_options={"stream_results":True,"yield_per":chunk_size})
+        try:
+            for part in result.partitions(chunk_size): yield part
+        finally: result.close()
+    finally:
+        if conn is not bind: conn.close()
+
+def approximate_row_count(bind, table: str, schema: str=None)->int:
+    """Row count from the catalog (pg_class.reltuples on PostgreSQL, svv_table_info.tbl_rows on Redshift) instead of a
+    full-scan COUNT(*). Falls back to COUNT(*) on other dialects, when the estimate is missing or <=0 (never analyzed),
+    or when the catalog can't be read. bind is an Engine or a Connection."""
+    sa=_sa()
+    engine=bind if isinstance(bind,sa.Engine) else bind.engine
+    name=engine.dialect.name; est=None
+    if name in ("postgresql","redshift"):
+        # Probe on a separate short-lived connection: a failed catalog read must not abort the caller's
+        # transaction, and Redshift has no SAVEPOINT to isolate it with.
+        try:
+            with engine.connect() as probe:
+                if name=="redshift":
+                    est=probe.execute(sa.text('SELECT tbl_rows FROM svv_table_info WHERE "schema"=:s AND "table"=:t'),{"s":schema or "public","t":table}).scalar()
+                else:
+                    q=engine.dialect.identifier_preparer.quote
+                    est=probe.execute(sa.text("SELECT reltuples::bigint FROM pg_class WHERE oid=to_regclass(:n)"),{"n":f"{q(schema)}.{q(table)}" if schema else q(table)}).scalar()
+        except Exception: est=None
+    if est is not None and est>0: return int(est)
+    count=sa.select(sa.func.count()).select_from(sa.table(table,schema=schema))
+    if isinstance(bind,sa.Engine):
+        with bind.connect() as conn: return int(conn.execute(count).scalar())
+    return int(bind.execute(count).scalar())
+
+def _warm_pool(engine, cfg: Dict[str,Any])->None:
+    """Open and return up to pool_warm (default 4, capped at pool_size) connections so the first
+    checks don't pay connect/auth latency. Best-effort: a failed warm-up never breaks the env build."""
+    size=getattr(engine.pool,"size",None)
+    if not callable(size): return  # not a QueuePool (e.g. sqlite)
+    n=min(size(),int(cfg.get("pool_warm",4)))
+    conns=[]
+    try:
+        for _ in range(n): conns.append(engine.connect())
+    except Exception: pass
+    finally:
+        for c in conns: c.close()
+
+# MongoClient is thread-safe and pools connections itself, so one client per URL
+# (and pool options) is shared by every env build instead of paying server discovery each time.
+# max_pool_size / min_pool_size in the orm cfg map to maxPoolSize / minPoolSize.
+_MONGO_CLIENTS: Dict[Any,Any]={}
+_MONGO_LOCK=threading.Lock()
+_MONGO_POOL_CFG={"max_pool_size":"maxPoolSize","min_pool_size":"minPoolSize"}
+
+def _mongo_client(url: str, **opts):
+    key=(url,tuple(sorted(opts.items())))
+    with _MONGO_LOCK:
+        client=_MONGO_CLIENTS.get(key)
+        if client is None:
+            client=_MONGO_CLIENTS[key]=_pymongo().MongoClient(url,**opts)
+        return client
+
+@atexit.register
+def _close_mongo_clients():
+    with _MONGO_LOCK:
+        for c in _MONGO_CLIENTS.values(): c.close()
+        _MONGO_CLIENTS.clear()
+
+def _lazy_inspector(engine):
+    """Zero-arg callable returning one shared Inspector for engine, built on first use, so its
+    info_cache (reflection query results) is reused across reflections. .cache_clear() drops it after schema changes."""
+    inspect=_sa().inspect
+    return functools.lru_cache(maxsize=None)(lambda: inspect(engine))
+
+# Reflected MetaData is pickled here between processes, with the time of its first reflection;
+# entries expire a day after that (not after the last write: lazy envs re-save as tables are touched).
+# Set reflect_cache: false in the orm cfg to bypass, or bump schema_version to invalidate.
+_MD_CACHE_DIR=os.path.join(os.path.expanduser("~"),".cache","quail","metadata")
+_MD_CACHE_TTL=24*3600
+
+def _metadata_cache_key(cfg: Dict[str,Any])->str:
+    parts=[cfg.get("url") or "",cfg.get("schema") or "",",".join(sorted(cfg.get("reflect") or [])),str(cfg.get("schema_version",""))]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+def _load_cached_metadata(key: str):
+    """(reflected_at, MetaData) or None. The MetaData may hold only some of the configured tables."""
+    path=os.path.join(_MD_CACHE_DIR,key+".pickle")
+    try:
+        with open(path,"rb") as f: ts,md=pickle.load(f)
+        return None if time.time()-ts>_MD_CACHE_TTL else (ts,md)
+    except Exception: return None  # missing, expired, old format or unreadable: reflect instead
+
+def _save_cached_metadata(key: str, md, reflected_at: float)->None:
+    try:
+        os.makedirs(_MD_CACHE_DIR,exist_ok=True)
+        tmp=os.path.join(_MD_CACHE_DIR,f"{key}.{os.getpid()}.tmp")
+        with open(tmp,"wb") as f: pickle.dump((reflected_at,md),f)
+        os.replace(tmp,os.path.join(_MD_CACHE_DIR,key+".pickle"))
+    except Exception: pass  # the cache is best-effort
+
+class LazyTables(Mapping):
+    """env["tables"] for sql envs: configured tables keyed "schema.name", each reflected on first
+    access (or taken straight from an already-populated MetaData). Thread-safe for parallel runs."""
+    def __init__(self, md, schema, names, get_inspector, on_reflect=None):
+        self._md=md; self._schema=schema; self._get_inspector=get_inspector; self._on_reflect=on_reflect
+        self._names={f"{schema}.{n}":n for n in names}; self._lock=threading.Lock()
+    def __getitem__(self, key):
+        name=self._names[key]
+        mdkey=f"{self._schema}.{name}" if self._schema else name
+        t=self._md.tables.get(mdkey)
+        if t is None:
+            with self._lock:
+                t=self._md.tables.get(mdkey)
+                if t is None:
+                    t=_sa().Table(name,self._md,schema=self._schema,autoload_with=self._get_inspector())
+                    if self._on_reflect: self._on_reflect(self._md)
+        return t
+    def __iter__(self): return iter(self._names)
+    def __len__(self): return len(self._names)
+
+def engine_env(url: str, cfg: Dict[str,Any])->Dict[str,Any]:
+    """Engine-level part of a sql env, shared by build_env_from_cfg and core.build_env_from_orm:
+    a pooled (and warmed) engine, session_factory, scoped_session (one reused Session per thread;
+    call .remove() when a thread is done), get_inspector (shared Inspector; .cache_clear() after DDL)
+    and the execute_many / stream_query / approximate_row_count helpers bound to the engine."""
+    sa=_sa()
+    engine=sa.create_engine(url,**_pool_options(cfg,url),**_dialect_options(cfg,url))
+    _warm_pool(engine,cfg)
+    Session=sa.orm.sessionmaker(bind=engine)
+    return {"engine":engine,"session_factory":Session,"scoped_session":sa.orm.scoped_session(Session),
+            "get_inspector":_lazy_inspector(engine),
+            "execute_many":functools.partial(execute_many,engine),
+            "stream_query":functools.partial(stream_query,engine),
+            "approximate_row_count":functools.partial(approximate_row_count,engine)}
+
+_NO_ENGINE=dict.fromkeys(("engine","session_factory","scoped_session","get_inspector","execute_many","stream_query","approximate_row_count"))
+
+# Envs built per canonical (JSON) config, so repeated builds share one engine/pool.
+_ENV_CACHE: Dict[str,Dict[str,Any]]={}
+_ENV_LOCK=threading.Lock()
 
 def build_env_from_cfg(cfg: Dict[str,Any])->Dict[str,Any]:
+    """Memoized per config (and QUAIL_POOL_SIZE / QUAIL_MAX_OVERFLOW): identical cfgs share one engine
+    (and pool) or client. Returns a shallow copy the caller may modify. clear_env_cache() disposes the cached engines."""
+    # the pool-size env overrides are read at build time, so they are part of the key
+    pool_env={v:os.environ.get(v) for v in _POOL_ENV.values()}
+    try: key=json.dumps([cfg,pool_env],sort_keys=True)
+    except (TypeError,ValueError): return _build_env(cfg)  # not JSON-able: build uncached
+    with _ENV_LOCK: env=_ENV_CACHE.get(key)
+    if env is None:
+        # build outside the lock (connects, warms the pool, may reflect) so unrelated configs don't queue
+        built=_build_env(cfg)
+        with _ENV_LOCK: env=_ENV_CACHE.setdefault(key,built)
+        if env is not built and built.get("engine") is not None: built["engine"].dispose()  # lost the race
+    return dict(env)
+
+def clear_env_cache()->None:
+    with _ENV_LOCK:
+        for env in _ENV_CACHE.values():
+            if env.get("engine") is not None: env["engine"].dispose()
+        _ENV_CACHE.clear()
+
+def _build_env(cfg: Dict[str,Any])->Dict[str,Any]:
     kind=(cfg.get("kind") or "").lower()
     if kind=="sql":
-        from sqlalchemy import create_engine, MetaData, Table
-        from sqlalchemy.orm import sessionmaker
+        sa=_sa()
         url=cfg.get("url"); schema=cfg.get("schema")
-        engine=create_engine(url) if url else None
-        Session=sessionmaker(bind=engine) if engine else None
-        md=MetaData(schema=schema)
-        tables={}
-        for name in cfg.get("reflect") or []:
-            tables[f"{schema}.{name}"]=Table(name,md,schema=schema,autoload_with=engine)
-        return {"engine":engine,"session_factory":Session,"metadata":md,"tables":tables}
+        env=engine_env(url,cfg) if url else dict(_NO_ENGINE)
+        get_inspector=env["get_inspector"]
+        names=list(cfg.get("reflect") or [])
+        use_cache=bool(names) and cfg.get("reflect_cache",True) is not False
+        key=_metadata_cache_key(cfg) if use_cache else None
+        hit=_load_cached_metadata(key) if use_cache else None
+        reflected_at,md=hit if hit else (time.time(),sa.MetaData(schema=schema))
+        lazy=cfg.get("lazy_reflect",True) is not False
+        if names and not lazy:
+            # a lazy env may have cached only the tables it touched: reflect the rest now
+            missing=[n for n in names if (f"{schema}.{n}" if schema else n) not in md.tables]
+            if missing:
+                md.reflect(bind=get_inspector(),schema=schema,only=missing)  # one batched pass, not one round-trip set per table
+                if use_cache: _save_cached_metadata(key,md,reflected_at)
+        # lazy (default): reflect each table on first env["tables"][...] access, so startup
+        # doesn't depend on how many tables are configured; lazy_reflect: false reflects up front
+        save=(lambda m: _save_cached_metadata(key,m,reflected_at)) if use_cache else None
+        tables=LazyTables(md,schema,names,get_inspector,save)
+        env.update(metadata=md,tables=tables)
+        return env
     if kind=="mongo":
-        from pymongo import MongoClient
+        _pymongo()  # fail early with the install hint
         url=cfg.get("url"); dbn=cfg.get("database")
-        client=MongoClient(url) if url else None
+        opts={v:int(cfg[k]) for k,v in _MONGO_POOL_CFG.items() if k in cfg}
+        client=_mongo_client(url,**opts) if url else None
         db=client[dbn] if client and dbn else None
-        return {"mongo_client":client,"mongo_db":db,"get_collection":(lambda n: db[n])}
+        cols: Dict[str,Any]={}  # db[n] builds a new Collection each call; keep one per name
+        def get_collection(n):
+            c=cols.get(n)
+            return c if c is not None else cols.setdefault(n,db[n])
+        return {"mongo_client":client,"mongo_db":db,"get_collection":get_collection,"collections":cols}
     return {}
+
+def iter_documents(collection, query: Dict[str,Any]=None, *, projection=None, batch_size: int=1000, **kwargs):
+    """Yields documents from collection.find with a larger server batch (fewer getMore round-trips); closes the cursor when done."""
+    cursor=collection.find(query or {},projection=projection,batch_size=batch_size,**kwargs)
+    try: yield from cursor
+    finally: cursor.close()
+
+class BufferedMongoWriter:
+    """Buffers writes to one collection and sends them with bulk_write, batch_size ops per round-trip."""
+    def __init__(self, collection, batch_size: int=1000, ordered: bool=False):
+        self.collection=collection; self.batch_size=batch_size; self.ordered=ordered; self._ops=[]
+    def insert(self, doc: Dict[str,Any]):
+        self.add(_pymongo().InsertOne(doc))
+    def add(self, op):
+        self._ops.append(op)
+        if len(self._ops)>=self.batch_size: self.flush()
+    def flush(self):
+        if not self._ops: return None
+        ops,self._ops=self._ops,[]
+        return self.collection.bulk_write(ops,ordered=self.ordered)
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None: self.flush()